@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import numpy as np
+from numba import njit, prange
+
+# Flag bits returned by components_batch; the scorer maps them back to the
+# human-readable flag strings in the API payload.
+FLAG_WIDE_SPREAD = 1
+FLAG_LOW_LIQUIDITY = 2
+FLAG_NO_60M_HISTORY = 4
+FLAG_NO_VOL_HISTORY = 8
+
+@njit(cache=True, nogil=True, parallel=True)
+def components_batch(
+    p15: np.ndarray,
+    p60: np.ndarray,
+    vol_5m: np.ndarray,
+    vol_60m: np.ndarray,
+    last_price: np.ndarray,
+    best_bid: np.ndarray,
+    best_ask: np.ndarray,
+    vol24: np.ndarray,
+    max_spread_pct: float,
+    min_quote_vol_usd_24h: float,
+    out_r15: np.ndarray,
+    out_r60: np.ndarray,
+    out_va: np.ndarray,
+    out_sp: np.ndarray,
+    out_qv: np.ndarray,
+    out_scores: np.ndarray,
+    out_flags: np.ndarray,
+):
+    """Score every product in parallel, one prange iteration each.
+
+    Inputs are flat per-product vectors gathered by the scorer: the
+    15m/60m reference prices (from TickerState's cached cutoff indices)
+    and the rolling volume sums, so each iteration is pure scalar math
+    with no cross-product state. Missing inputs travel as NaN and missing
+    outputs come back as NaN; the caller translates those to None for the
+    API payload. Gating flags are written as a bitmask.
+    """
+    for i in prange(len(last_price)):
+        lp = last_price[i]
+
+        # Momentum vs 15m/60m ago. Non-positive reference prices count as
+        # missing history, like the NaN case (and 0.0 would divide to inf).
+        ret_15m = lp / p15[i] - 1.0 if p15[i] > 0.0 else np.nan
+        ret_60m = lp / p60[i] - 1.0 if p60[i] > 0.0 else np.nan
+
+        # Volume anomaly: last 5m volume vs average 5m volume over last 60m
+        v60 = vol_60m[i]
+        vol_anom = (vol_5m[i] / (v60 / 12.0)) if v60 > 0.0 else np.nan
+
+        # Spread
+        spread_pct = np.nan
+        bid = best_bid[i]
+        ask = best_ask[i]
+        if bid > 0.0 and ask > 0.0:  # NaN compares false
+            mid = (ask + bid) / 2.0
+            if mid > 0.0:
+                spread_pct = (ask - bid) / mid
+
+        # Approx 24h quote volume in USD
+        quote_vol = vol24[i] * lp  # NaN propagates
+
+        flags = 0
+        if not np.isnan(spread_pct) and spread_pct > max_spread_pct:
+            flags |= FLAG_WIDE_SPREAD
+        if not np.isnan(quote_vol) and quote_vol < min_quote_vol_usd_24h:
+            flags |= FLAG_LOW_LIQUIDITY
+        if np.isnan(ret_60m):
+            flags |= FLAG_NO_60M_HISTORY
+        if np.isnan(vol_anom):
+            flags |= FLAG_NO_VOL_HISTORY
+
+        # Score: simple heuristic (momentum + flow - spread penalty), with
+        # neutral defaults where components are missing.
+        r15 = ret_15m if not np.isnan(ret_15m) else 0.0
+        r60 = ret_60m if not np.isnan(ret_60m) else 0.0
+        va = vol_anom if not np.isnan(vol_anom) else 1.0
+        sp = spread_pct if not np.isnan(spread_pct) else 0.0
+
+        out_r15[i] = ret_15m
+        out_r60[i] = ret_60m
+        out_va[i] = vol_anom
+        out_sp[i] = spread_pct
+        out_qv[i] = quote_vol
+        out_flags[i] = flags
+        out_scores[i] = (0.60 * r15) + (0.40 * r60) + (0.08 * np.log1p(max(0.0, va - 1.0))) - (3.0 * sp)
+
+def warm() -> None:
+    # Force JIT compilation (or on-disk cache load) now so the first real
+    # /api/opportunities request doesn't pay the compile cost.
+    ones = np.ones(1, dtype=np.float64)
+    flags = np.zeros(1, dtype=np.int64)
+    components_batch(
+        ones, ones, ones, 12.0 * ones, ones, ones, ones, ones,
+        0.006, 5e6,
+        ones.copy(), ones.copy(), ones.copy(), ones.copy(), ones.copy(), ones.copy(), flags,
+    )
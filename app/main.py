@@ -2,14 +2,16 @@ from __future__ import annotations
 
 import asyncio
 import os
+import time
 from pathlib import Path
 
 from fastapi import FastAPI, Response
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 
+from .kernels import warm as warm_kernels
 from .models import AppState
-from .ws_client import run_ws_loop
+from .ws_client import run_prune_loop, run_ws_loop
 from .scorer import score_opportunities
 
 WS_URL = os.getenv("WS_URL", "wss://ws-feed.exchange.coinbase.com")
@@ -17,6 +19,7 @@ QUOTE_CCY = os.getenv("QUOTE_CCY", "USD").upper()
 MAX_PRODUCTS = int(os.getenv("MAX_PRODUCTS", "300"))
 MIN_QUOTE_VOL_USD_24H = float(os.getenv("MIN_QUOTE_VOL_USD_24H", "5000000"))
 MAX_SPREAD_PCT = float(os.getenv("MAX_SPREAD_PCT", "0.006"))
+OPPS_CACHE_TTL = float(os.getenv("OPPS_CACHE_TTL", "1.5"))  # seconds
 
 BASE_DIR = Path(__file__).resolve().parent
 STATIC_DIR = BASE_DIR / "static"
@@ -26,6 +29,12 @@ app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 
 STATE = AppState()
 
+# Short-TTL cache for /api/opportunities: ticker data only changes a few
+# times a second and the score isn't real-time-critical, so bursts of
+# polling (browsers, dashboards, health checks) share one rescore.
+_opps_cache: dict = {}  # (horizon, limit) -> (expires_at, payload)
+_opps_lock = asyncio.Lock()
+
 @app.on_event("startup")
 async def _startup():
     # Start the websocket listener as a background task.
@@ -35,6 +44,11 @@ async def _startup():
         quote_ccy=QUOTE_CCY,
         max_products=MAX_PRODUCTS,
     ))
+    # Periodically drop samples older than the scorer's ~2h window.
+    asyncio.create_task(run_prune_loop(STATE))
+    # Compile (or load from cache) the numba scoring kernel off the event
+    # loop, so the first /api/opportunities hit doesn't pay JIT time.
+    asyncio.create_task(asyncio.to_thread(warm_kernels))
 
 @app.get("/", response_class=HTMLResponse)
 async def home():
@@ -42,7 +56,6 @@ async def home():
 
 @app.get("/api/status")
 async def api_status():
-    import time
     now = time.time()
     return {
         "ok": True,
@@ -62,13 +75,26 @@ async def api_status():
 @app.get("/api/opportunities")
 async def api_opportunities(horizon: int = 60, limit: int = 10):
     # Horizon is accepted for future extension; MVP uses 15m/60m momentum regardless.
-    return score_opportunities(
-        state=STATE,
-        horizon_minutes=horizon,
-        limit=limit,
-        min_quote_vol_usd_24h=MIN_QUOTE_VOL_USD_24H,
-        max_spread_pct=MAX_SPREAD_PCT,
-    )
+    key = (horizon, limit)
+    async with _opps_lock:
+        cached = _opps_cache.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        # Run the rescore off the event loop so websocket ingest and other
+        # requests keep flowing while it works (the kernel is nogil).
+        payload = await asyncio.to_thread(
+            score_opportunities,
+            state=STATE,
+            horizon_minutes=horizon,
+            limit=limit,
+            min_quote_vol_usd_24h=MIN_QUOTE_VOL_USD_24H,
+            max_spread_pct=MAX_SPREAD_PCT,
+        )
+        if len(_opps_cache) > 64:
+            # don't let querystring variations grow the cache unbounded
+            _opps_cache.clear()
+        _opps_cache[key] = (time.monotonic() + OPPS_CACHE_TTL, payload)
+        return payload
 
 
 @app.head("/")
@@ -1,10 +1,28 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from collections import deque
-from typing import Deque, Dict, Optional, Tuple
+from typing import Dict, Optional
 import time
 
+import numpy as np
+
+# Ring-buffer capacity (samples). At ticker_batch rates this comfortably
+# covers the ~2h window the scorer looks at.
+PRICE_CAPACITY = 5000
+
+# One volume bucket per minute over the trailing hour.
+VOL_BUCKETS = 60
+
+# Bases we never rank: stablecoin pairs have no meaningful momentum.
+STABLE_BASES = {"USDC", "USDT", "DAI", "EURC", "TUSD", "USDP"}
+
+# Timestamps in the ring buffers are int32 seconds relative to this base
+# (captured at import), and values are float32 (~7 significant digits, ample
+# for momentum ratios and volume sums). Together that halves the footprint
+# and memory bandwidth versus float64 epochs/values; the scorer only ever
+# works with relative cutoffs, so whole-second resolution is enough.
+TS_BASE = time.time()
+
 @dataclass
 class ProductMeta:
     product_id: str
@@ -14,10 +32,33 @@ class ProductMeta:
 
 @dataclass
 class TickerState:
-    # Rolling last ~2h of price points (timestamp seconds, price float)
-    prices: Deque[Tuple[float, float]] = field(default_factory=lambda: deque(maxlen=5000))
-    # Rolling last ~2h of trade sizes (timestamp seconds, size float)
-    sizes: Deque[Tuple[float, float]] = field(default_factory=lambda: deque(maxlen=20000))
+    # Rolling last ~2h of price samples, struct-of-arrays: one array of
+    # timestamps (int32 seconds since TS_BASE) and one of float32 prices,
+    # stored in a fixed-size ring buffer. `head_px` is the physical index of
+    # the oldest sample, `n_px` the live count.
+    ts_prices: np.ndarray = field(default_factory=lambda: np.empty(PRICE_CAPACITY, dtype=np.int32))
+    px: np.ndarray = field(default_factory=lambda: np.empty(PRICE_CAPACITY, dtype=np.float32))
+    head_px: int = 0
+    n_px: int = 0
+
+    # Trade volume as per-minute buckets over the trailing hour, plus rolling
+    # 5m/60m sums. The scorer only ever needed those two totals, so the full
+    # size time series is gone. bucket_minute is the absolute minute
+    # (offset-domain) of the newest bucket, None before the first trade —
+    # legitimate minutes can be negative when feed timestamps precede
+    # TS_BASE, so a numeric sentinel won't do.
+    vol_buckets: np.ndarray = field(default_factory=lambda: np.zeros(VOL_BUCKETS, dtype=np.float64))
+    bucket_minute: Optional[int] = None
+    vol_5m_sum: float = 0.0
+    vol_60m_sum: float = 0.0
+
+    # Cached price cutoff indices (logical, 0 = oldest live sample), advanced
+    # incrementally as samples arrive so scoring needs no per-request binary
+    # search. They point at the last sample at or before (newest - window),
+    # or -1; the window anchor is the newest sample's timestamp, which only
+    # moves on append.
+    idx_15m: int = -1
+    idx_60m: int = -1
 
     last_price: Optional[float] = None
     best_bid: Optional[float] = None
@@ -25,6 +66,84 @@ class TickerState:
     volume_24h_base: Optional[float] = None  # as provided by feed, in base units
     last_update: Optional[float] = None
 
+    def append_price(self, ts: float, price: float) -> None:
+        i = (self.head_px + self.n_px) % PRICE_CAPACITY
+        self.ts_prices[i] = ts - TS_BASE
+        self.px[i] = price
+        if self.n_px < PRICE_CAPACITY:
+            self.n_px += 1
+        else:
+            # Full: we just overwrote the oldest sample, shifting all
+            # logical indices down by one.
+            self.head_px = (self.head_px + 1) % PRICE_CAPACITY
+            if self.idx_15m >= 0:
+                self.idx_15m -= 1
+            if self.idx_60m >= 0:
+                self.idx_60m -= 1
+        # Re-anchor the cached cutoffs at the new newest sample. Cutoffs only
+        # move forward, so this is amortized O(1) per append.
+        t_off = int(self.ts_prices[i])
+        self.idx_15m = self._advance_price_idx(self.idx_15m, t_off - 15 * 60)
+        self.idx_60m = self._advance_price_idx(self.idx_60m, t_off - 60 * 60)
+
+    def record_size(self, ts: float, size: float) -> None:
+        self._roll_buckets(int((ts - TS_BASE) // 60))
+        self.vol_buckets[self.bucket_minute % VOL_BUCKETS] += size
+        self.vol_5m_sum += size
+        self.vol_60m_sum += size
+
+    def roll_volume_window(self, now_ts: float) -> None:
+        # Age out bucket minutes for products with no recent trades, so the
+        # rolling sums decay to zero instead of going stale. Called from the
+        # periodic prune sweep.
+        if self.bucket_minute is not None:
+            self._roll_buckets(int((now_ts - TS_BASE) // 60))
+
+    def _roll_buckets(self, minute: int) -> None:
+        if self.bucket_minute is None:
+            self.bucket_minute = minute
+            return
+        steps = minute - self.bucket_minute
+        if steps <= 0:
+            return
+        if steps >= VOL_BUCKETS:
+            self.vol_buckets[:] = 0.0
+            self.vol_60m_sum = 0.0
+        else:
+            for m in range(self.bucket_minute + 1, minute + 1):
+                slot = m % VOL_BUCKETS
+                # this slot's old minute just left the 60m window
+                self.vol_60m_sum -= float(self.vol_buckets[slot])
+                self.vol_buckets[slot] = 0.0
+        self.bucket_minute = minute
+        s = 0.0
+        for k in range(5):
+            s += float(self.vol_buckets[(minute - k) % VOL_BUCKETS])
+        self.vol_5m_sum = s
+
+    def price_at(self, idx: int) -> float:
+        """Price at a logical index (0 = oldest live sample)."""
+        return float(self.px[(self.head_px + idx) % PRICE_CAPACITY])
+
+    def _advance_price_idx(self, idx: int, cutoff: int) -> int:
+        # Largest logical index with ts <= cutoff (or -1).
+        while idx + 1 < self.n_px and self.ts_prices[(self.head_px + idx + 1) % PRICE_CAPACITY] <= cutoff:
+            idx += 1
+        return idx
+
+    def prune(self, cutoff_ts: float) -> None:
+        # Samples are time-ordered, so dropping old ones is just advancing the
+        # logical start index past everything older than the cutoff.
+        cutoff = cutoff_ts - TS_BASE
+        dropped = 0
+        while self.n_px and self.ts_prices[self.head_px] < cutoff:
+            self.head_px = (self.head_px + 1) % PRICE_CAPACITY
+            self.n_px -= 1
+            dropped += 1
+        if dropped:
+            self.idx_15m = max(-1, self.idx_15m - dropped)
+            self.idx_60m = max(-1, self.idx_60m - dropped)
+
 @dataclass
 class AppState:
     started_at: float = field(default_factory=lambda: time.time())
@@ -35,6 +154,9 @@ class AppState:
     products: Dict[str, ProductMeta] = field(default_factory=dict)
     tickers: Dict[str, TickerState] = field(default_factory=dict)
     tracked_product_ids: list[str] = field(default_factory=list)
+    # Encoded ids for pre-parse frame filtering; refreshed whenever
+    # tracked_product_ids changes.
+    tracked_product_bytes: frozenset[bytes] = frozenset()
 
     # Simple counters
     ticker_messages: int = 0
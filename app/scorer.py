@@ -2,26 +2,22 @@ from __future__ import annotations
 
 import math
 import time
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Optional
 
-from .models import AppState, TickerState
+import numpy as np
 
-STABLE_BASES = {"USDC", "USDT", "DAI", "EURC", "TUSD", "USDP"}
+from .kernels import (
+    FLAG_LOW_LIQUIDITY,
+    FLAG_NO_60M_HISTORY,
+    FLAG_NO_VOL_HISTORY,
+    FLAG_WIDE_SPREAD,
+    components_batch,
+)
+from .models import STABLE_BASES, AppState, TickerState
 
-def _find_price_at_or_before(series: List[Tuple[float, float]], target_ts: float) -> Optional[float]:
-    # series is sorted by time ascending
-    # We scan from the end (most recent) backwards to find first <= target
-    for ts, px in reversed(series):
-        if ts <= target_ts:
-            return px
-    return None
-
-def _sum_sizes_after(series: List[Tuple[float, float]], cutoff_ts: float) -> float:
-    s = 0.0
-    for ts, size in series:
-        if ts >= cutoff_ts:
-            s += size
-    return s
+def _opt(x: float) -> Optional[float]:
+    # Kernel outputs use NaN for "not available"; the API uses None.
+    return None if math.isnan(x) else float(x)
 
 def score_opportunities(
     state: AppState,
@@ -31,76 +27,107 @@ def score_opportunities(
     max_spread_pct: float = 0.006,
 ) -> Dict:
     now = time.time()
-    items = []
 
     # Warm-up heuristic: if we started < 20m ago, most pairs won't have good stats.
     uptime = now - state.started_at
     warmup = "warming_up" if uptime < 20 * 60 else ("partial" if uptime < 75 * 60 else "ready")
 
-    for pid in state.tracked_product_ids:
+    # Phase 1: gather per-product inputs into flat vectors (SoA across
+    # products). All lookups are O(1) reads off TickerState — the cutoff
+    # indices and volume sums are maintained on the append path.
+    # Snapshot the list reference once: we run in a worker thread and the
+    # event loop swaps in a new list on reconnect; sizing the arrays from
+    # one list and iterating another could overrun them.
+    tracked = state.tracked_product_ids
+    cap = len(tracked)
+    pids = []
+    price_nows = np.empty(cap, dtype=np.float64)
+    p15v = np.empty(cap, dtype=np.float64)
+    p60v = np.empty(cap, dtype=np.float64)
+    vol5v = np.empty(cap, dtype=np.float64)
+    vol60v = np.empty(cap, dtype=np.float64)
+    bidv = np.empty(cap, dtype=np.float64)
+    askv = np.empty(cap, dtype=np.float64)
+    vol24v = np.empty(cap, dtype=np.float64)
+
+    for pid in tracked:
         t: TickerState = state.tickers.get(pid)  # type: ignore
         if not t or t.last_price is None or t.last_update is None:
             continue
 
-        # Copy deques to lists to avoid holding references during iteration
-        prices = list(t.prices)
-        sizes = list(t.sizes)
-
         # Basic sanity
-        if len(prices) < 10:
+        if t.n_px < 10:
             continue
 
-        price_now = t.last_price
-        ts_now = prices[-1][0]
-
-        p15 = _find_price_at_or_before(prices, ts_now - 15 * 60)
-        p60 = _find_price_at_or_before(prices, ts_now - 60 * 60)
-
-        ret_15m = (price_now / p15 - 1.0) if p15 else None
-        ret_60m = (price_now / p60 - 1.0) if p60 else None
-
-        # Volume anomaly: last 5m volume vs average 5m volume over last 60m
-        vol_5m = _sum_sizes_after(sizes, ts_now - 5 * 60)
-        vol_60m = _sum_sizes_after(sizes, ts_now - 60 * 60)
-        vol_anom = (vol_5m / (vol_60m / 12.0)) if vol_60m > 0 else None  # 12 five-minute blocks per hour
-
-        # Spread
-        spread_pct = None
-        if t.best_bid and t.best_ask and t.best_ask > 0 and t.best_bid > 0:
-            mid = (t.best_ask + t.best_bid) / 2.0
-            if mid > 0:
-                spread_pct = (t.best_ask - t.best_bid) / mid
-
-        # Approx 24h quote volume in USD
-        quote_vol_usd_24h = None
-        if t.volume_24h_base is not None:
-            quote_vol_usd_24h = t.volume_24h_base * price_now
-
+        k = len(pids)
+        price_nows[k] = t.last_price
+        p15v[k] = t.price_at(t.idx_15m) if t.idx_15m >= 0 else math.nan
+        p60v[k] = t.price_at(t.idx_60m) if t.idx_60m >= 0 else math.nan
+        vol5v[k] = t.vol_5m_sum
+        vol60v[k] = t.vol_60m_sum
+        bidv[k] = t.best_bid if t.best_bid is not None else math.nan
+        askv[k] = t.best_ask if t.best_ask is not None else math.nan
+        vol24v[k] = t.volume_24h_base if t.volume_24h_base is not None else math.nan
+        pids.append(pid)
+
+    n = len(pids)
+
+    # Phase 2: one parallel kernel call scores every product (prange over
+    # the product axis), writing components, flags and scores into
+    # preallocated output arrays.
+    r15v = np.empty(n, dtype=np.float64)
+    r60v = np.empty(n, dtype=np.float64)
+    vav = np.empty(n, dtype=np.float64)
+    spv = np.empty(n, dtype=np.float64)
+    qvv = np.empty(n, dtype=np.float64)
+    scores = np.empty(n, dtype=np.float64)
+    flagv = np.empty(n, dtype=np.int64)
+    components_batch(
+        p15v[:n], p60v[:n], vol5v[:n], vol60v[:n],
+        price_nows[:n], bidv[:n], askv[:n], vol24v[:n],
+        max_spread_pct, min_quote_vol_usd_24h,
+        r15v, r60v, vav, spv, qvv, scores, flagv,
+    )
+
+    # Gating: ignore very wide spreads, or very low liquidity (unless we're still warming)
+    if warmup == "ready":
+        keep = (flagv & (FLAG_WIDE_SPREAD | FLAG_LOW_LIQUIDITY)) == 0
+    else:
+        keep = np.ones(n, dtype=bool)
+
+    kept = np.nonzero(keep)[0]
+
+    # Top-N selection: argpartition pulls the N best in O(n), then only those
+    # N get sorted — no full sort, no Python-level comparator.
+    lim = max(1, limit)
+    kept_scores = scores[kept]
+    if len(kept) > lim:
+        part = np.argpartition(-kept_scores, lim - 1)[:lim]
+        order = part[np.argsort(-kept_scores[part])]
+    else:
+        order = np.argsort(-kept_scores)
+
+    # Only the products actually returned pay for flag/driver strings and
+    # dict assembly; everything above worked on raw floats.
+    top = []
+    for j in order:
+        i = int(kept[j])
+        flag_bits = int(flagv[i])
         flags = []
-        if spread_pct is not None and spread_pct > max_spread_pct:
+        if flag_bits & FLAG_WIDE_SPREAD:
             flags.append("WIDE_SPREAD")
-        if quote_vol_usd_24h is not None and quote_vol_usd_24h < min_quote_vol_usd_24h:
+        if flag_bits & FLAG_LOW_LIQUIDITY:
             flags.append("LOW_LIQUIDITY")
-        if ret_60m is None:
+        if flag_bits & FLAG_NO_60M_HISTORY:
             flags.append("NO_60M_HISTORY")
-        if vol_anom is None:
+        if flag_bits & FLAG_NO_VOL_HISTORY:
             flags.append("NO_VOL_HISTORY")
 
-        # Gating: ignore very wide spreads, or very low liquidity (unless we're still warming)
-        if warmup == "ready":
-            if spread_pct is not None and spread_pct > max_spread_pct:
-                continue
-            if quote_vol_usd_24h is not None and quote_vol_usd_24h < min_quote_vol_usd_24h:
-                continue
-
-        # Score: simple heuristic (momentum + flow - spread penalty)
-        # Use small eps to avoid None or math errors.
-        r15 = ret_15m if ret_15m is not None else 0.0
-        r60 = ret_60m if ret_60m is not None else 0.0
-        va = vol_anom if vol_anom is not None else 1.0
-        sp = spread_pct if spread_pct is not None else 0.0
-
-        score = (0.60 * r15) + (0.40 * r60) + (0.08 * math.log1p(max(0.0, va - 1.0))) - (3.0 * sp)
+        ret_15m = _opt(r15v[i])
+        ret_60m = _opt(r60v[i])
+        vol_anom = _opt(vav[i])
+        spread_pct = _opt(spv[i])
+        quote_vol_usd_24h = _opt(qvv[i])
 
         drivers = []
         if ret_15m is not None:
@@ -114,22 +141,19 @@ def score_opportunities(
         if quote_vol_usd_24h is not None:
             drivers.append(f"24h $vol ~{quote_vol_usd_24h:,.0f}")
 
-        items.append({
-            "product_id": pid,
-            "price": round(price_now, 10),
+        top.append({
+            "product_id": pids[i],
+            "price": round(float(price_nows[i]), 10),
             "ret_15m": ret_15m,
             "ret_60m": ret_60m,
             "vol_anom": vol_anom,
             "spread_pct": spread_pct,
             "quote_vol_usd_24h": quote_vol_usd_24h,
-            "score": score,
+            "score": float(scores[i]),
             "flags": flags,
             "drivers": drivers[:5],
         })
 
-    items.sort(key=lambda x: x["score"], reverse=True)
-    top = items[: max(1, limit)]
-
     note = ""
     if not top:
         note = "No opportunities yet — waiting for ticker data (this is normal right after deploy)."
@@ -144,7 +168,7 @@ def score_opportunities(
         "meta": {
             "ws_connected": state.ws_connected,
             "last_msg_seconds_ago": None if state.ws_last_msg_at is None else round(now - state.ws_last_msg_at, 1),
-            "tracked_products": len(state.tracked_product_ids),
+            "tracked_products": len(tracked),
             "ticker_messages": state.ticker_messages,
             "status_messages": state.status_messages,
             "warmup": warmup,
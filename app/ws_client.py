@@ -1,16 +1,17 @@
 from __future__ import annotations
 
 import asyncio
-import json
+import calendar
 import time
 from typing import Dict, List, Optional
 
-import websockets
-from websockets import WebSocketClientProtocol
+import orjson
+from websockets.asyncio.client import ClientConnection, connect
 
-from .models import AppState, ProductMeta, TickerState
+from .models import STABLE_BASES, AppState, ProductMeta, TickerState
 
-STABLE_BASES = {"USDC", "USDT", "DAI", "EURC", "TUSD", "USDP"}
+# Constant payload, encoded once at import; sent on every (re)connect.
+_STATUS_SUB = orjson.dumps({"type": "subscribe", "channels": [{"name": "status"}]})
 
 def _safe_float(x) -> Optional[float]:
     try:
@@ -31,17 +32,16 @@ async def run_ws_loop(
     backoff = 1.0
     while True:
         try:
-            async with websockets.connect(ws_url, ping_interval=20, ping_timeout=20) as ws:
+            # compression=None: Coinbase frames are small and frequent, so
+            # permessage-deflate costs more CPU than the bandwidth is worth.
+            async with connect(ws_url, ping_interval=20, ping_timeout=20, max_size=2**20, compression=None) as ws:
                 state.ws_connected = True
                 state.ws_last_error = None
                 backoff = 1.0
 
                 # 1) Subscribe to status (gives us the full product list on interval)
                 # Per docs, you must subscribe within 5 seconds or you're disconnected.
-                await ws.send(json.dumps({
-                    "type": "subscribe",
-                    "channels": [{"name": "status"}]
-                }))
+                await ws.send(_STATUS_SUB)
 
                 # Wait for first status message so we know what products exist
                 product_ids = await _await_first_status_and_select_products(state, ws, quote_ccy, max_products)
@@ -50,7 +50,7 @@ async def run_ws_loop(
                 # Use ticker_batch for frequent updates and reduced bandwidth.
                 chunks = _chunk(product_ids, subscribe_chunk_size)
                 for ch in chunks:
-                    await ws.send(json.dumps({
+                    await ws.send(orjson.dumps({
                         "type": "subscribe",
                         "product_ids": ch,
                         "channels": ["ticker_batch"]
@@ -58,10 +58,14 @@ async def run_ws_loop(
                     # small delay to avoid spamming subscribe messages
                     await asyncio.sleep(0.25)
 
-                # 3) Listen forever
-                async for msg in ws:
-                    state.ws_last_msg_at = time.time()
-                    _handle_message(state, msg)
+                # 3) Listen forever. decode=False hands us the raw payload
+                # bytes without a UTF-8 decode pass; orjson parses bytes
+                # natively. A closed connection raises and we reconnect.
+                while True:
+                    raw = await ws.recv(decode=False)
+                    wall = time.time()
+                    state.ws_last_msg_at = wall
+                    _handle_message(state, raw, wall)
 
         except Exception as e:
             state.ws_connected = False
@@ -74,7 +78,7 @@ async def run_ws_loop(
 
 async def _await_first_status_and_select_products(
     state: AppState,
-    ws: WebSocketClientProtocol,
+    ws: ClientConnection,
     quote_ccy: str,
     max_products: int,
 ) -> List[str]:
@@ -82,12 +86,13 @@ async def _await_first_status_and_select_products(
     deadline = time.time() + 20
     selected: List[str] = []
     while time.time() < deadline:
-        raw = await ws.recv()
-        state.ws_last_msg_at = time.time()
-        _handle_message(state, raw)
+        raw = await ws.recv(decode=False)
+        wall = time.time()
+        state.ws_last_msg_at = wall
+        _handle_message(state, raw, wall)
 
         try:
-            data = json.loads(raw)
+            data = orjson.loads(raw)
         except Exception:
             continue
         if data.get("type") != "status":
@@ -110,16 +115,18 @@ async def _await_first_status_and_select_products(
 
         # Selection: online spot pairs quoted in quote_ccy, excluding stable bases.
         # Heuristic: prefer *-USD pairs (or chosen quote_ccy).
+        suffix = f"-{quote_ccy}"
         candidates = [
             pid for pid, meta in state.products.items()
             if meta.quote_currency == quote_ccy
             and (meta.status or "").lower() == "online"
             and meta.base_currency not in STABLE_BASES
-            and pid.endswith(f"-{quote_ccy}")
+            and pid.endswith(suffix)
         ]
         candidates.sort()  # stable order; can be replaced later with volume-based once tickers arrive
         selected = candidates[:max_products]
         state.tracked_product_ids = selected
+        state.tracked_product_bytes = frozenset(pid.encode() for pid in selected)
         # Ensure ticker state exists
         for pid in selected:
             state.tickers.setdefault(pid, TickerState())
@@ -128,13 +135,29 @@ async def _await_first_status_and_select_products(
     # If we didn't receive status in time, fall back to a minimal set
     fallback = [f"BTC-{quote_ccy}", f"ETH-{quote_ccy}"]
     state.tracked_product_ids = fallback
+    state.tracked_product_bytes = frozenset(pid.encode() for pid in fallback)
     for pid in fallback:
         state.tickers.setdefault(pid, TickerState())
     return fallback
 
-def _handle_message(state: AppState, raw: str):
+_PRODUCT_ID_FIELD = b'"product_id":"'
+
+def _handle_message(state: AppState, raw: bytes, wall: float):
+    # `wall` is the receive-time wall clock, taken once in the listen loop
+    # and reused for the feed-time fallback and last_update below.
+    # Pre-parse filter: if the frame names a product we don't track, drop it
+    # before paying for a full JSON parse. Status frames carry products under
+    # "id", not "product_id", so they pass through untouched. We subscribe to
+    # exactly what we track, so this mostly matters during tracked-list churn.
+    i = raw.find(_PRODUCT_ID_FIELD)
+    if i >= 0:
+        start = i + len(_PRODUCT_ID_FIELD)
+        end = raw.find(b'"', start)
+        if end >= 0 and raw[start:end] not in state.tracked_product_bytes:
+            return
+
     try:
-        data = json.loads(raw)
+        data = orjson.loads(raw)
     except Exception:
         return
 
@@ -160,11 +183,11 @@ def _handle_message(state: AppState, raw: str):
         volume_24h = _safe_float(data.get("volume_24h"))
         last_size = _safe_float(data.get("last_size"))
 
-        ts = _parse_time_to_epoch(data.get("time")) or time.time()
+        ts = _parse_time_to_epoch(data.get("time")) or wall
 
         if price is not None:
             t.last_price = price
-            t.prices.append((ts, price))
+            t.append_price(ts, price)
 
         if best_bid is not None:
             t.best_bid = best_bid
@@ -173,34 +196,51 @@ def _handle_message(state: AppState, raw: str):
         if volume_24h is not None:
             t.volume_24h_base = volume_24h
         if last_size is not None:
-            t.sizes.append((ts, last_size))
+            t.record_size(ts, last_size)
 
-        t.last_update = time.time()
+        t.last_update = wall
 
-        # prune old points occasionally
-        _prune(t, older_than_seconds=2 * 60 * 60)
+# Midnight epoch of the most recently seen date, so the hot parser below
+# only converts (y, m, d) once per day rather than once per message.
+_day_cache_key = ""
+_day_cache_epoch = 0.0
 
 def _parse_time_to_epoch(t) -> Optional[float]:
-    # Coinbase Exchange WS times are ISO8601 strings, e.g. "2022-10-19T23:28:22.061769Z"
-    if not isinstance(t, str):
+    # Coinbase Exchange WS times are fixed-format ISO8601 UTC strings,
+    # e.g. "2022-10-19T23:28:22.061769Z". Slice the digits out directly
+    # instead of building a datetime object per message.
+    global _day_cache_key, _day_cache_epoch
+    # Only the Z-suffixed form is trusted; anything else (e.g. a numeric
+    # offset) returns None so the caller's wall-clock fallback applies.
+    if not isinstance(t, str) or len(t) < 20 or t[10] != "T" or t[-1] != "Z":
         return None
     try:
-        # Very small parser to avoid extra dependencies:
-        # Use datetime from stdlib.
-        from datetime import datetime, timezone
-        if t.endswith("Z"):
-            t = t[:-1] + "+00:00"
-        dt = datetime.fromisoformat(t)
-        if dt.tzinfo is None:
-            dt = dt.replace(tzinfo=timezone.utc)
-        return dt.timestamp()
+        day = t[:10]
+        if day != _day_cache_key:
+            _day_cache_epoch = float(calendar.timegm((int(day[0:4]), int(day[5:7]), int(day[8:10]), 0, 0, 0)))
+            _day_cache_key = day
+        secs = _day_cache_epoch + int(t[11:13]) * 3600 + int(t[14:16]) * 60 + int(t[17:19])
+        if t[19] == ".":
+            # fractional seconds run up to the trailing "Z"
+            frac = t[20:-1]
+            secs += int(frac) / (10.0 ** len(frac))
+        return secs
     except Exception:
+        # Malformed digits fall back to the caller's default.
         return None
 
-def _prune(t: TickerState, older_than_seconds: int):
-    cutoff = time.time() - older_than_seconds
-    # deques are time-ordered, so pop left until in range
-    while t.prices and t.prices[0][0] < cutoff:
-        t.prices.popleft()
-    while t.sizes and t.sizes[0][0] < cutoff:
-        t.sizes.popleft()
+async def run_prune_loop(
+    state: AppState,
+    interval_seconds: float = 30.0,
+    older_than_seconds: int = 2 * 60 * 60,
+):
+    # Pruning per message was pure overhead (nothing expires at message
+    # rates); a periodic sweep over all products is plenty, and advancing a
+    # ring-buffer start index is cheap.
+    while True:
+        await asyncio.sleep(interval_seconds)
+        now = time.time()
+        cutoff = now - older_than_seconds
+        for t in state.tickers.values():
+            t.prune(cutoff)
+            t.roll_volume_window(now)